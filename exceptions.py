@@ -8,3 +8,23 @@ class EndpointStatusError(Exception):
     """Exception выбрасывается при ошибке состояния сервера."""
 
     pass
+
+
+class TransientAPIError(Exception):
+    """Exception выбрасывается при временной недоступности API."""
+
+    def __init__(self, message: str, retry_after: int = 0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EndpointTimeoutError(TransientAPIError):
+    """Exception выбрасывается при превышении времени ожидания ответа."""
+
+    pass
+
+
+class EndpointUnavailableError(TransientAPIError):
+    """Exception выбрасывается при сетевой недоступности сервера."""
+
+    pass
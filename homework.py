@@ -1,5 +1,10 @@
+import atexit
+import collections
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import sys
 import time
 from http import HTTPStatus
@@ -8,19 +13,41 @@ from typing import Union
 import requests
 import telegram
 from dotenv import load_dotenv
-from telegram.error import TelegramError
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
 
-from exceptions import ConnectionError, EndpointStatusError
+from exceptions import (ConnectionError, EndpointStatusError,
+                        EndpointTimeoutError, EndpointUnavailableError,
+                        TransientAPIError)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
 
 RETRY_PERIOD = 600
+MAX_BACKOFF = 3600
+MAX_RETRY_AFTER = 60
+TELEGRAM_MESSAGE_LIMIT = 4096
+PENDING_LIMIT = 100
+REQUEST_TIMEOUT = (5, 25)
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+TRANSIENT_STATUSES = frozenset((
+    HTTPStatus.REQUEST_TIMEOUT,
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+))
+RETRY_AFTER_STATUSES = frozenset((
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+))
 
 
 HOMEWORK_VERDICTS = {
@@ -28,22 +55,61 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+VERDICT_TEMPLATE = 'Изменился статус проверки работы "{}". {}'.format
 
 
 def check_tokens() -> bool:
     """Проверка токенов."""
-    return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
+    tokens = {
+        'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
+        'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
+        'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
+    }
+    missing = [name for name, value in tokens.items() if not value]
+    if missing:
+        logger.critical('Отсутствуют переменные окружения: '
+                        f'{", ".join(missing)}.')
+    return not missing
+
 
+def send_message(bot: telegram.Bot, message: str) -> bool:
+    """Отправка сообщения.
 
-def send_message(bot: telegram.Bot, message: str) -> None:
-    """Отправка сообщения."""
-    logging.debug('Начинаем отправку сообщения.')
+    Возвращает False, если сообщение стоит отправить повторно.
+    """
+    logger.debug('Начинаем отправку сообщения.')
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        try:
+            bot.send_message(TELEGRAM_CHAT_ID, message)
+        except RetryAfter as err:
+            if err.retry_after > MAX_RETRY_AFTER:
+                logger.warning('Telegram ограничил отправку сообщений на '
+                               f'{err.retry_after} с. Сообщение отложено.')
+                return False
+            time.sleep(err.retry_after + 1)
+            bot.send_message(TELEGRAM_CHAT_ID, message)
     except TelegramError as err:
-        logging.error(f'Ошибка работы с Telegram: {err}', exc_info=True)
-    else:
-        logging.debug('Сообщение отправлено.')
+        if (isinstance(err, (RetryAfter, NetworkError))
+                and not isinstance(err, BadRequest)):
+            logger.warning(f'Временная ошибка Telegram: {err}. '
+                           'Сообщение отложено.')
+            return False
+        logger.error(f'Ошибка работы с Telegram: {err}. '
+                     'Сообщение отброшено.', exc_info=True)
+        return True
+    logger.debug('Сообщение отправлено.')
+    return True
+
+
+def get_retry_after(response: requests.Response) -> int:
+    """Получение паузы из заголовка Retry-After ответа сервера."""
+    if response.status_code not in RETRY_AFTER_STATUSES:
+        return 0
+    try:
+        retry_after = int(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return 0
+    return max(0, min(retry_after, MAX_BACKOFF))
 
 
 def get_api_answer(timestamp: int) -> dict:
@@ -53,8 +119,22 @@ def get_api_answer(timestamp: int) -> dict:
         response = requests.get(
             ENDPOINT,
             headers=HEADERS,
-            params=payload
+            params=payload,
+            timeout=REQUEST_TIMEOUT
         )
+    except requests.exceptions.Timeout as err:
+        message = (f'Превышено время ожидания ответа сервера: {err}.'
+                   f' Параметры запроса: {ENDPOINT} - {HEADERS} - {payload}')
+        raise EndpointTimeoutError(message) from err
+    except (requests.exceptions.SSLError,
+            requests.exceptions.ProxyError) as err:
+        message = (f'Ошибка настройки соединения с сервером: {err}.'
+                   f' Параметры запроса: {ENDPOINT} - {HEADERS} - {payload}')
+        raise ConnectionError(message) from err
+    except requests.exceptions.ConnectionError as err:
+        message = (f'Сервер недоступен: {err}.'
+                   f' Параметры запроса: {ENDPOINT} - {HEADERS} - {payload}')
+        raise EndpointUnavailableError(message) from err
     except Exception as err:
         message = (f'При подключении к серверу произошла ошибка: {err}.'
                    f' Параметры запроса: {ENDPOINT} - {HEADERS} - {payload}')
@@ -63,7 +143,9 @@ def get_api_answer(timestamp: int) -> dict:
         message = (f'Получен неверный ответ от сервера: {response.status_code}'
                    f'. Параметры запроса: {ENDPOINT} - {HEADERS} - {payload}.'
                    f' Текст ответа: {response.text}')
-        raise EndpointStatusError(message)
+        if response.status_code not in TRANSIENT_STATUSES:
+            raise EndpointStatusError(message)
+        raise TransientAPIError(message, get_retry_after(response))
     return response.json()
 
 
@@ -82,56 +164,149 @@ def check_response(response: Union[list, dict]) -> list:
 
 def parse_status(homework: dict) -> str:
     """Парсинг статуса работы."""
+    verdicts = HOMEWORK_VERDICTS
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
     if not homework_name:
         raise KeyError('В ответе отсутствует имя работы.')
     elif not homework_status:
         raise KeyError('В ответе отсутствует статус работы.')
-    if homework_status not in HOMEWORK_VERDICTS:
+    if homework_status not in verdicts:
         raise KeyError(f'Статус работы {homework_name}'
                        ' отличается от заданного.')
-    verdict = HOMEWORK_VERDICTS[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return VERDICT_TEMPLATE(homework_name, verdicts[homework_status])
+
+
+def parse_homeworks(homeworks: list) -> list:
+    """Парсинг статусов всех работ из ответа.
+
+    Ошибка в одной работе не мешает отправить вердикты по остальным.
+    """
+    messages = []
+    for homework in homeworks:
+        try:
+            messages.append(parse_status(homework))
+        except Exception as err:
+            message = f'Сбой в работе программы: {err}'
+            logger.error(message, exc_info=True)
+            messages.append(message)
+    return messages
+
+
+def send_pending(bot: telegram.Bot, pending: collections.deque) -> None:
+    """Отправка накопленных сообщений по порядку.
+
+    Сообщения, которые стоит отправить повторно, остаются в очереди.
+    """
+    while pending:
+        if not send_message(bot, pending[0]):
+            return
+        pending.popleft()
+
+
+def pack_messages(messages: list) -> list:
+    """Объединение сообщений в блоки с учетом лимита длины Telegram."""
+    chunks = []
+    chunk = []
+    size = 0
+    limit = TELEGRAM_MESSAGE_LIMIT
+    parts = [
+        message[start:start + limit]
+        for message in messages
+        for start in range(0, len(message), limit)
+    ]
+    for message in parts:
+        if chunk and size + len(message) > limit:
+            chunks.append('\n\n'.join(chunk))
+            chunk = []
+            size = 0
+        chunk.append(message)
+        size += len(message) + 2
+    if chunk:
+        chunks.append('\n\n'.join(chunk))
+    return chunks
+
+
+def get_retry_delay(failures: int) -> float:
+    """Расчет паузы перед повторным запросом после серии ошибок."""
+    if not failures:
+        return RETRY_PERIOD
+    delay = RETRY_PERIOD * 2 ** min(failures, 6)
+    return min(delay * (1 + random.uniform(0, 0.5)), MAX_BACKOFF)
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """Настройка логирования через фоновый обработчик очереди.
+
+    Неизвестное значение LOG_LEVEL заменяется на INFO.
+    """
+    level = logging.getLevelName(LOG_LEVEL)
+    is_known_level = isinstance(level, int)
+    if not is_known_level:
+        level = logging.INFO
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    )
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    root_logger = logging.getLogger()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(level)
+    if not is_known_level:
+        logger.warning(f'Неизвестный уровень логирования "{LOG_LEVEL}", '
+                       'используется INFO.')
+    return listener
 
 
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
-        message = 'Отсутствуют токены для работы бота. Работа остановлена.'
-        logging.critical(message)
-        sys.exit(message)
+        sys.exit('Отсутствуют токены для работы бота. Работа остановлена.')
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
     timestamp = int(time.time())
     last_message = ''
+    pending = collections.deque(maxlen=PENDING_LIMIT)
+    failures = 0
 
     while True:
+        retry_after = 0
         try:
             response = get_api_answer(timestamp)
             timestamp = response.get('current_date', timestamp)
             homeworks = check_response(response)
             if homeworks:
-                message = parse_status(homeworks[0])
-                logging.debug('Отправляем сообщение')
+                messages = parse_homeworks(homeworks)
+                logger.debug('Отправляем сообщение')
             else:
-                message = 'Нет новых домашних работ.'
-                logging.debug(message)
+                messages = ['Нет новых домашних работ.']
+                logger.debug(messages[0])
+            message = '\n\n'.join(messages)
             if message != last_message:
                 last_message = message
-                send_message(bot, message)
+                pending.extend(pack_messages(messages))
+            failures = 0
+        except TransientAPIError as err:
+            failures += 1
+            retry_after = err.retry_after
+            logger.warning(f'Временный сбой API: {err}')
         except Exception as err:
+            failures += 1
             message = f'Сбой в работе программы: {err}'
-            logging.error(message, exc_info=True)
+            logger.error(message, exc_info=True)
             if message != last_message:
                 last_message = message
-                send_message(bot, message)
+                pending.extend(pack_messages([message]))
         finally:
-            time.sleep(RETRY_PERIOD)
+            send_pending(bot, pending)
+            delay = max(get_retry_delay(failures), retry_after)
+            time.sleep(delay)
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        format='%(asctime)s %(levelname)s %(message)s',
-        level=logging.DEBUG
-    )
+    configure_logging()
     main()
@@ -0,0 +1,443 @@
+import atexit
+import collections
+import logging
+import random
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+import telegram
+
+import exceptions
+import utils
+
+
+class TestRetryDelay:
+
+    def test_no_failures_keeps_retry_period(self, homework_module):
+        assert homework_module.get_retry_delay(0) == (
+            homework_module.RETRY_PERIOD
+        )
+
+    def test_delay_grows_with_failures(self, monkeypatch, homework_module):
+        monkeypatch.setattr(random, 'uniform', lambda a, b: 0)
+        delays = [homework_module.get_retry_delay(n) for n in (1, 2)]
+        assert delays == [
+            homework_module.RETRY_PERIOD * 2,
+            homework_module.RETRY_PERIOD * 4,
+        ]
+
+    @pytest.mark.parametrize('failures', (1, 3, 6, 50))
+    def test_delay_never_exceeds_max_backoff(self, monkeypatch, failures,
+                                             homework_module):
+        monkeypatch.setattr(random, 'uniform', lambda a, b: b)
+        assert homework_module.get_retry_delay(failures) <= (
+            homework_module.MAX_BACKOFF
+        )
+
+
+class TestCheckTokens:
+
+    def test_missing_token_is_named(self, monkeypatch, caplog,
+                                    homework_module):
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcd')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', None)
+        with caplog.at_level(logging.CRITICAL):
+            assert homework_module.check_tokens() is False
+        messages = [
+            record.message for record in caplog.records
+            if record.levelno == logging.CRITICAL
+        ]
+        assert len(messages) == 1
+        assert 'TELEGRAM_CHAT_ID' in messages[0]
+        assert 'PRACTICUM_TOKEN' not in messages[0]
+        assert 'TELEGRAM_TOKEN' not in messages[0]
+
+    def test_no_log_when_tokens_present(self, monkeypatch, caplog,
+                                        homework_module):
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcd')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        with caplog.at_level(logging.CRITICAL):
+            assert homework_module.check_tokens() is True
+        assert not caplog.records
+
+
+class TestSendMessage:
+
+    @pytest.fixture
+    def bot(self, monkeypatch, random_message, homework_module):
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(
+            telegram, 'Bot',
+            lambda *args, **kwargs: utils.MockTelegramBot(**kwargs)
+        )
+        return telegram.Bot(token='')
+
+    def test_returns_true_when_sent(self, bot, homework_module):
+        assert homework_module.send_message(bot, 'message') is True
+        assert bot.text == 'message'
+
+    @pytest.mark.parametrize('error', (
+        telegram.error.NetworkError('Connection reset'),
+        telegram.error.TimedOut(),
+    ))
+    def test_network_error_is_retried(self, monkeypatch, bot, error,
+                                      homework_module):
+        def send_with_error(*args, **kwargs):
+            raise error
+
+        monkeypatch.setattr(bot, 'send_message', send_with_error)
+        assert homework_module.send_message(bot, 'message') is False
+
+    @pytest.mark.parametrize('error', (
+        telegram.error.TelegramError('Something wrong'),
+        telegram.error.BadRequest('Chat not found'),
+        telegram.error.Unauthorized('Unauthorized'),
+        telegram.error.ChatMigrated(12345),
+    ))
+    def test_permanent_error_is_dropped(self, monkeypatch, caplog, bot,
+                                        error, homework_module):
+        def send_with_error(*args, **kwargs):
+            raise error
+
+        monkeypatch.setattr(bot, 'send_message', send_with_error)
+        with caplog.at_level(logging.ERROR):
+            assert homework_module.send_message(bot, 'message') is True
+        assert any(
+            record.levelno == logging.ERROR for record in caplog.records
+        )
+
+    def test_rejected_message_does_not_block_queue(self, monkeypatch, bot,
+                                                   homework_module):
+        delivered = []
+
+        def send_rejecting_first(chat_id=None, text=None, **kwargs):
+            if text == 'rejected':
+                raise telegram.error.BadRequest('Chat not found')
+            delivered.append(text)
+
+        monkeypatch.setattr(bot, 'send_message', send_rejecting_first)
+        pending = collections.deque(('rejected', 'next'))
+        homework_module.send_pending(bot, pending)
+        assert delivered == ['next']
+        assert not pending
+
+    def test_recoverable_error_keeps_queue(self, monkeypatch, bot,
+                                           homework_module):
+        def send_with_error(*args, **kwargs):
+            raise telegram.error.TimedOut()
+
+        monkeypatch.setattr(bot, 'send_message', send_with_error)
+        pending = collections.deque(('first', 'second'))
+        homework_module.send_pending(bot, pending)
+        assert list(pending) == ['first', 'second']
+
+    def test_short_retry_after_is_waited_out(self, monkeypatch, bot,
+                                             homework_module):
+        calls = []
+        sleeps = []
+
+        def send_rate_limited(chat_id=None, text=None, **kwargs):
+            calls.append(text)
+            if len(calls) == 1:
+                raise telegram.error.RetryAfter(5)
+
+        monkeypatch.setattr(bot, 'send_message', send_rate_limited)
+        monkeypatch.setattr(time, 'sleep', sleeps.append)
+        assert homework_module.send_message(bot, 'message') is True
+        assert calls == ['message', 'message']
+        assert sleeps == [6]
+
+    def test_long_retry_after_is_not_waited_out(self, monkeypatch, bot,
+                                                homework_module):
+        def send_rate_limited(*args, **kwargs):
+            raise telegram.error.RetryAfter(
+                homework_module.MAX_RETRY_AFTER + 1
+            )
+
+        def sleep_forbidden(secs):
+            raise AssertionError('send_message не должна ждать так долго.')
+
+        monkeypatch.setattr(bot, 'send_message', send_rate_limited)
+        monkeypatch.setattr(time, 'sleep', sleep_forbidden)
+        assert homework_module.send_message(bot, 'message') is False
+
+
+class TestMainDelivery:
+
+    def test_undelivered_status_is_resent(self, monkeypatch,
+                                          random_timestamp, homework_module):
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcd')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(
+            telegram, 'Bot',
+            lambda *args, **kwargs: utils.MockTelegramBot(**kwargs)
+        )
+        responses = iter((
+            {
+                'homeworks': [{'homework_name': 'hw123',
+                               'status': 'approved'}],
+                'current_date': random_timestamp,
+            },
+            {'homeworks': [], 'current_date': random_timestamp},
+        ))
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET(*args, **kwargs)
+            data = next(responses)
+            response.json = lambda: data
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        delivered = []
+        attempts = []
+
+        def mock_send_message(bot, message):
+            attempts.append(message)
+            if len(attempts) == 1:
+                return False
+            delivered.append(message)
+            return True
+
+        monkeypatch.setattr(homework_module, 'send_message',
+                            mock_send_message)
+        sleeps = []
+
+        def sleep_to_interrupt(secs):
+            sleeps.append(secs)
+            if len(sleeps) == 2:
+                raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(time, 'sleep', sleep_to_interrupt)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        verdict = homework_module.HOMEWORK_VERDICTS['approved']
+        assert len(delivered) == 2
+        assert verdict in delivered[0]
+        assert delivered[1] == 'Нет новых домашних работ.'
+
+
+class TestRequestTimeout:
+
+    def test_request_has_timeout(self, monkeypatch, current_timestamp,
+                                 homework_module):
+        calls = []
+
+        def check_request_get_call(*args, **kwargs):
+            calls.append(kwargs)
+            return utils.MockResponseGET(*args, **kwargs)
+
+        monkeypatch.setattr(requests, 'get', check_request_get_call)
+        homework_module.get_api_answer(current_timestamp)
+        assert calls, 'Запрос к API должен выполняться через requests.get.'
+        assert 'timeout' in calls[0], (
+            'Проверьте, что в запрос к API передан параметр `timeout`.'
+        )
+        assert calls[0]['timeout'] == homework_module.REQUEST_TIMEOUT, (
+            'Проверьте, что в запрос передан `timeout=REQUEST_TIMEOUT`.'
+        )
+
+    def test_bad_homework_does_not_drop_others(self, monkeypatch,
+                                               random_timestamp,
+                                               homework_module):
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcd')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(
+            telegram, 'Bot',
+            lambda *args, **kwargs: utils.MockTelegramBot(**kwargs)
+        )
+        data = {
+            'homeworks': [
+                {'homework_name': 'a', 'status': 'approved'},
+                {'homework_name': 'b', 'status': 'weird'},
+            ],
+            'current_date': random_timestamp,
+        }
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET(*args, **kwargs)
+            response.json = lambda: data
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        delivered = []
+
+        def mock_send_message(bot, message):
+            delivered.append(message)
+            return True
+
+        monkeypatch.setattr(homework_module, 'send_message',
+                            mock_send_message)
+
+        def sleep_to_interrupt(secs):
+            raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(time, 'sleep', sleep_to_interrupt)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        text = '\n\n'.join(delivered)
+        assert (
+            'Изменился статус проверки работы "a". '
+            + homework_module.HOMEWORK_VERDICTS['approved']
+        ) in text
+        assert 'Сбой в работе программы' in text
+        assert 'b' in text.split('Сбой в работе программы')[1]
+
+
+class TestTransientErrors:
+
+    @staticmethod
+    def mock_response_get(http_status, headers=None):
+        def mocked_response(*args, **kwargs):
+            response = utils.MockResponseGET(*args, http_status=http_status,
+                                             **kwargs)
+            response.headers = headers or {}
+            return response
+        return mocked_response
+
+    @pytest.mark.parametrize('http_status', (
+        HTTPStatus.REQUEST_TIMEOUT,
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    ))
+    def test_transient_statuses(self, monkeypatch, http_status,
+                                current_timestamp, homework_module):
+        monkeypatch.setattr(requests, 'get',
+                            self.mock_response_get(http_status))
+        with pytest.raises(exceptions.TransientAPIError) as exc_info:
+            homework_module.get_api_answer(current_timestamp)
+        assert exc_info.value.retry_after == 0
+
+    @pytest.mark.parametrize('http_status', (
+        HTTPStatus.BAD_REQUEST,
+        HTTPStatus.UNAUTHORIZED,
+        HTTPStatus.NOT_FOUND,
+    ))
+    def test_terminal_statuses(self, monkeypatch, http_status,
+                               current_timestamp, homework_module):
+        monkeypatch.setattr(requests, 'get',
+                            self.mock_response_get(http_status))
+        with pytest.raises(exceptions.EndpointStatusError):
+            homework_module.get_api_answer(current_timestamp)
+
+    @pytest.mark.parametrize('header, expected', (
+        ('30', 30),
+        ('99999', 3600),
+        ('-5', 0),
+        ('²', 0),
+        ('Wed, 21 Oct 2015 07:28:00 GMT', 0),
+    ))
+    def test_retry_after_header(self, monkeypatch, header, expected,
+                                current_timestamp, homework_module):
+        monkeypatch.setattr(requests, 'get', self.mock_response_get(
+            HTTPStatus.SERVICE_UNAVAILABLE, {'Retry-After': header}
+        ))
+        with pytest.raises(exceptions.TransientAPIError) as exc_info:
+            homework_module.get_api_answer(current_timestamp)
+        assert exc_info.value.retry_after == expected
+        assert exc_info.value.retry_after <= homework_module.MAX_BACKOFF
+
+    @pytest.mark.parametrize('error', (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+    ))
+    def test_network_errors_are_transient(self, monkeypatch, error,
+                                          current_timestamp,
+                                          homework_module):
+        def mock_request_get_with_exception(*args, **kwargs):
+            raise error('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        with pytest.raises(exceptions.TransientAPIError):
+            homework_module.get_api_answer(current_timestamp)
+
+    @pytest.mark.parametrize('error', (
+        requests.exceptions.SSLError,
+        requests.exceptions.ProxyError,
+    ))
+    def test_configuration_errors_are_reported(self, monkeypatch, error,
+                                               current_timestamp,
+                                               homework_module):
+        def mock_request_get_with_exception(*args, **kwargs):
+            raise error('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        with pytest.raises(exceptions.ConnectionError) as exc_info:
+            homework_module.get_api_answer(current_timestamp)
+        assert not isinstance(exc_info.value, exceptions.TransientAPIError)
+
+
+class TestPackMessages:
+
+    def test_short_messages_share_one_chunk(self, homework_module):
+        assert homework_module.pack_messages(['first', 'second']) == [
+            'first\n\nsecond'
+        ]
+
+    def test_chunks_split_at_limit(self, homework_module):
+        limit = homework_module.TELEGRAM_MESSAGE_LIMIT
+        messages = ['a' * (limit // 2 - 1)] * 3
+        chunks = homework_module.pack_messages(messages)
+        assert len(chunks) == 2
+        assert all(len(chunk) <= limit for chunk in chunks)
+        assert '\n\n'.join(chunks) == '\n\n'.join(messages)
+
+    def test_oversized_message_is_split(self, homework_module):
+        limit = homework_module.TELEGRAM_MESSAGE_LIMIT
+        message = 'x' * (limit + 1000)
+        chunks = homework_module.pack_messages([message])
+        assert [len(chunk) for chunk in chunks] == [limit, 1000]
+        assert ''.join(chunks) == message
+
+
+class TestConfigureLogging:
+
+    @pytest.fixture
+    def configure_logging(self, monkeypatch, homework_module):
+        root_logger = logging.getLogger()
+        handlers = root_logger.handlers[:]
+        level = root_logger.level
+        listeners = []
+        monkeypatch.setattr(atexit, 'register', lambda func: None)
+
+        def configure(log_level):
+            monkeypatch.setattr(homework_module, 'LOG_LEVEL', log_level)
+            listeners.append(homework_module.configure_logging())
+            return root_logger.level
+
+        yield configure
+        for listener in listeners:
+            listener.stop()
+        root_logger.handlers = handlers
+        root_logger.setLevel(level)
+
+    @pytest.mark.parametrize('log_level, expected', (
+        ('DEBUG', logging.DEBUG),
+        ('WARNING', logging.WARNING),
+    ))
+    def test_known_level_is_used(self, configure_logging, caplog,
+                                 log_level, expected):
+        assert configure_logging(log_level) == expected
+        assert not [
+            record for record in caplog.records
+            if record.levelno == logging.WARNING
+        ]
+
+    @pytest.mark.parametrize('log_level', ('VERBOSE', ''))
+    def test_unknown_level_falls_back_to_info(self, configure_logging,
+                                              caplog, log_level):
+        assert configure_logging(log_level) == logging.INFO
+        warnings = [
+            record.message for record in caplog.records
+            if record.levelno == logging.WARNING
+        ]
+        assert len(warnings) == 1
+        assert f'"{log_level}"' in warnings[0]